@@ -10,13 +10,36 @@ Created on Thu Aug 20 16:23:47 2015
 """
 
 import os
-from numpy import zeros, ones, array
+import sys
+from collections import namedtuple
+from numpy import zeros, ones, array, frombuffer, flatnonzero, uint8
 
 _BASIC_CHILD_EXTENSIONS = [ 'nodes',
                       'edges',
                       'tri',
                       'z' ]
 
+# Files read by ChildRun, paired with the quantity given on the second header
+# line of each time slice (which is also the number of data lines that follow)
+_SCANNED_CHILD_FILES = [ ('nodes', 'nodes'),
+                         ('edges', 'edges'),
+                         ('tri', 'triangles'),
+                         ('z', 'nodes'),
+                         ('area', 'core_nodes'),
+                         ('net', 'core_nodes'),
+                         ('q', 'nodes'),
+                         ('slp', 'nodes'),
+                         ('tau', 'nodes'),
+                         ('varea', 'nodes') ]
+
+_SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+
+_NEWLINE = ord('\n')
+
+SliceInfo = namedtuple('SliceInfo', ['index', 'time', 'number_of_nodes',
+                                     'number_of_edges', 'number_of_triangles',
+                                     'number_of_core_nodes', 'complete'])
+
 
 class ChildRun(object):
     """
@@ -61,6 +84,7 @@ class ChildRun(object):
         >>> cr = ChildRun('test.edges')
         """
         basename = os.path.splitext(name)[0]
+        self.basename = basename
         try:
             self.nodefile = open(basename+'.nodes', 'r')
             self.edgefile = open(basename+'.edges', 'r')
@@ -77,6 +101,15 @@ class ChildRun(object):
             raise IOError
             
             
+    def scan(self, chunk_size=_SCAN_CHUNK_SIZE):
+        """
+        Scans the whole run without parsing the data blocks, and returns a
+        ChildRunScan. The files are opened separately, so the position of
+        read_next_timeslice is not affected.
+        """
+        return scan_child_run(self.basename, chunk_size)
+        
+        
     def read_next_timeslice(self):
         """
         Reads data for the next timeslice for the current run.
@@ -431,6 +464,222 @@ def child_files_exist_with_name(the_name):
     return True
 
 
+class _LineScanner(object):
+    """
+    Reads lines from a file opened in binary mode, one large chunk at a time.
+    Newline positions are located for a whole chunk at once, so whole data
+    blocks can be skipped without splitting them into lines.
+    """
+    def __init__(self, fileobj, chunk_size=_SCAN_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buf = b''
+        self.pos = 0
+        self.newlines = zeros(0, dtype=int)
+        self.next_newline = 0
+        
+        
+    def refill(self):
+        """
+        Reads the next chunk, keeping any unfinished line from the current
+        one. Returns False at end of file.
+        """
+        data = self.fileobj.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self.newlines = flatnonzero(frombuffer(self.buf, dtype=uint8)==_NEWLINE)
+        self.next_newline = 0
+        return True
+        
+        
+    def readline(self):
+        """
+        Returns the next line, or an empty string at end of file.
+        """
+        while self.next_newline==len(self.newlines):
+            if not self.refill():
+                line = self.buf[self.pos:]
+                self.pos = len(self.buf)
+                return line
+        end = self.newlines[self.next_newline] + 1
+        line = self.buf[self.pos:end]
+        self.pos = end
+        self.next_newline += 1
+        return line
+        
+        
+    def skip_lines(self, n):
+        """
+        Skips n lines. Returns the number of lines that were missing because
+        the end of the file was reached first (0 if all n lines were there).
+        """
+        while n>0:
+            available = len(self.newlines) - self.next_newline
+            if available>=n:
+                self.next_newline += n
+                self.pos = self.newlines[self.next_newline-1] + 1
+                return 0
+            n -= available
+            if available>0:
+                self.pos = self.newlines[-1] + 1
+            self.next_newline = len(self.newlines)
+            if not self.refill():
+                # an unterminated last line still counts as a line
+                if self.pos<len(self.buf):
+                    self.pos = len(self.buf)
+                    n -= 1
+                return n
+        return 0
+        
+        
+def scan_child_file(filename, chunk_size=_SCAN_CHUNK_SIZE):
+    """
+    Scans one CHILD output file, reading only the two header lines of each
+    time slice and skipping its data block.
+    
+    Returns a list of (time, count, lines_missing) tuples, one per time slice,
+    and a message describing any unreadable header (or None). lines_missing
+    is non-zero only for a slice that was cut short by the end of the file.
+    """
+    slices = []
+    with open(filename, 'rb') as f:
+        scanner = _LineScanner(f, chunk_size)
+        while True:
+            line = scanner.readline()
+            if not line:
+                return slices, None
+            try:
+                tm = float(line)
+            except ValueError:
+                return slices, 'bad time line ' + repr(line.strip()) \
+                               + ' at slice ' + str(len(slices))
+            line = scanner.readline()
+            try:
+                count = int(line)
+            except ValueError:
+                if not line:
+                    return slices, 'slice ' + str(len(slices)) \
+                                   + ' ends after its time line'
+                return slices, 'bad count line ' + repr(line.strip()) \
+                               + ' at slice ' + str(len(slices))
+            slices.append((tm, count, scanner.skip_lines(count)))
+            
+            
+class ChildRunScan(object):
+    """
+    Summary of the time slices in a CHILD run, as produced by scan_child_run.
+    
+    slices is a list of SliceInfo records, one for each time slice found in
+    any of the files. problems is a list of messages describing slices that
+    are missing, truncated or inconsistent between files; a slice affected by
+    any of these has complete set to False.
+    """
+    def __init__(self, basename, slices, problems):
+        self.basename = basename
+        self.slices = slices
+        self.problems = problems
+        
+        
+    @property
+    def number_of_slices(self):
+        return len(self.slices)
+        
+        
+    @property
+    def times(self):
+        return array([s.time for s in self.slices])
+        
+        
+    @property
+    def is_consistent(self):
+        return len(self.problems)==0
+        
+        
+    def format_table(self):
+        """
+        Returns the slice table and any problems as a printable string.
+        """
+        lines = [ 'CHILD run ' + self.basename + ': ' \
+                  + str(self.number_of_slices) + ' time slices',
+                  '%6s %14s %10s %10s %10s %10s %s' % ('slice', 'time',
+                  'nodes', 'edges', 'triangles', 'core', 'ok') ]
+        for s in self.slices:
+            lines.append('%6d %14g %10s %10s %10s %10s %s' % (s.index, s.time,
+                         s.number_of_nodes, s.number_of_edges,
+                         s.number_of_triangles, s.number_of_core_nodes,
+                         'yes' if s.complete else 'NO'))
+        if self.problems:
+            lines.append(str(len(self.problems)) + ' problem(s) found:')
+            for p in self.problems:
+                lines.append('  ' + p)
+        else:
+            lines.append('All files agree.')
+        return '\n'.join(lines)
+        
+        
+def scan_child_run(filename, chunk_size=_SCAN_CHUNK_SIZE):
+    """
+    Scans all the files of a CHILD run and returns a ChildRunScan with the
+    time and node/edge/triangle counts of every time slice. Unlike
+    read_next_timeslice, missing, truncated or mismatched slices are recorded
+    as problems rather than stopping the scan. Raises an IOError if one or
+    more of the files cannot be found.
+    
+    Parameters
+    ----------
+    filename : str
+        Base name for CHILD run (any extension is removed).
+    chunk_size : int, optional
+        Number of bytes read from a file at a time.
+    """
+    basename = os.path.splitext(filename)[0]
+    scans = []
+    problems = []
+    for ext, quantity in _SCANNED_CHILD_FILES:
+        slices, error = scan_child_file(basename+'.'+ext, chunk_size)
+        if error is not None:
+            problems.append('.' + ext + ': ' + error)
+        scans.append((ext, quantity, slices))
+    
+    num_slices = max(len(slices) for ext, quantity, slices in scans)
+    result = []
+    for i in range(num_slices):
+        counts = {}
+        tm = None
+        complete = True
+        for ext, quantity, slices in scans:
+            if i>=len(slices):
+                problems.append('.' + ext + ': slice ' + str(i) + ' is missing')
+                complete = False
+                continue
+            file_time, count, lines_missing = slices[i]
+            if tm is None:
+                tm = file_time
+            elif file_time!=tm:
+                problems.append('.' + ext + ': slice ' + str(i) + ' has time '
+                                + str(file_time) + ', expected ' + str(tm))
+                complete = False
+            if lines_missing>0:
+                problems.append('.' + ext + ': slice ' + str(i)
+                                + ' is truncated (' + str(lines_missing)
+                                + ' of ' + str(count) + ' lines missing)')
+                complete = False
+            if quantity not in counts:
+                counts[quantity] = count
+            elif count!=counts[quantity]:
+                problems.append('.' + ext + ': slice ' + str(i) + ' has '
+                                + str(count) + ' ' + quantity + ', expected '
+                                + str(counts[quantity]))
+                complete = False
+        result.append(SliceInfo(i, tm, counts.get('nodes'), counts.get('edges'),
+                                counts.get('triangles'),
+                                counts.get('core_nodes'), complete))
+    
+    return ChildRunScan(basename, result, problems)
+
+
 def open_childrun(filename):
     """
     Creates and returns an instance of a childrun object, or throws an IOError.
@@ -439,6 +688,11 @@ def open_childrun(filename):
     
 
 if __name__=='__main__':
-    import doctest
-    doctest.testmod()
+    if len(sys.argv)>1:
+        # e.g. python child_reader.py myrun  -> summary of myrun.* files
+        for name in sys.argv[1:]:
+            print(scan_child_run(name).format_table())
+    else:
+        import doctest
+        doctest.testmod()
     
\ No newline at end of file
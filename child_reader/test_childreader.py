@@ -7,7 +7,10 @@ Created on Fri Aug 28 16:22:30 2015
 @author: gtucker
 """
 
-from child_reader import ChildRun
+from child_reader import ChildRun, scan_child_run
+import os
+import shutil
+import tempfile
 import numpy as np
 from numpy.testing import assert_array_equal
 
@@ -204,7 +207,60 @@ def test_child_reader():
                                              
                                              
 
+def test_scan():
+    """Tests scanning the headers of all time slices in a run"""
+    
+    cr = ChildRun('tests/testchildrun')
+    scan = cr.scan()
+    
+    assert scan.is_consistent, 'problems found: '+str(scan.problems)
+    assert scan.number_of_slices==51, 'there should be 51 time slices'
+    assert_array_equal(scan.times, np.arange(51.0))
+    for s in scan.slices:
+        assert s.complete
+        assert (s.number_of_nodes, s.number_of_edges, s.number_of_triangles, \
+                s.number_of_core_nodes)==(9, 34, 9, 1)
+    
+    # Small chunks should give exactly the same result
+    assert scan_child_run('tests/testchildrun', chunk_size=5).slices \
+           ==scan.slices
+           
+           
+def test_scan_reports_problems():
+    """Tests that scanning reports bad slices rather than stopping"""
+    
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for ext in ['nodes', 'edges', 'tri', 'z', 'area', 'net', 'q', 'slp', \
+                    'tau', 'varea']:
+            shutil.copy('tests/testchildrun.'+ext, tmpdir)
+        base = os.path.join(tmpdir, 'testchildrun')
+        
+        # Wrong time in slice 1 of .slp file (each slice has 11 lines)
+        lines = open(base+'.slp').readlines()
+        lines[11] = ' 99\n'
+        open(base+'.slp', 'w').writelines(lines)
+        
+        # Cut the .tau file off part way through the data for slice 49
+        lines = open(base+'.tau').readlines()
+        open(base+'.tau', 'w').writelines(lines[:545])
+        
+        scan = scan_child_run(base, chunk_size=64)
+    finally:
+        shutil.rmtree(tmpdir)
+        
+    assert scan.number_of_slices==51
+    assert [s.index for s in scan.slices if not s.complete]==[1, 49, 50]
+    assert scan.slices[1].time==1.0
+    assert len(scan.problems)==3
+    assert scan.problems[0].startswith('.slp: slice 1 has time 99')
+    assert scan.problems[1].startswith('.tau: slice 49 is truncated')
+    assert scan.problems[2]=='.tau: slice 50 is missing'
+
+
 if __name__=='__main__':
     test_child_reader()
+    test_scan()
+    test_scan_reports_problems()
 
     